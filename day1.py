@@ -1,40 +1,226 @@
 #!/usr/bin/env python3
 import sys
-import regex as re
+import os
+import re
+import mmap
+import time
+from collections import deque
+from multiprocessing import Pool
+
+DIGIT_WORDS = ("one", "two", "three", "four", "five", "six", "seven", "eight", "nine")
+
+
+def build_scanner(words: tuple[str, ...]) -> tuple[list[dict[str, int]], list[int]]:
+    """Aho-Corasick automaton over 0-9 plus `words`, where words[i] scores i + 1.
+
+    Returns the complete transition table and each state's digit value (-1 for none).
+    """
+    goto: list[dict[str, int]] = [{}]
+    out = [-1]
+    patterns = [(char, int(char)) for char in "0123456789"]
+    patterns += [(word, value) for value, word in enumerate(words, start=1)]
+    for pattern, value in patterns:
+        state = 0
+        for char in pattern:
+            if char not in goto[state]:
+                goto.append({})
+                out.append(-1)
+                goto[state][char] = len(goto) - 1
+            state = goto[state][char]
+        out[state] = value
+
+    fail = [0] * len(goto)
+    queue = deque(goto[0].values())
+    while queue:
+        state = queue.popleft()
+        for char, nxt in goto[state].items():
+            queue.append(nxt)
+            fail[nxt] = goto[fail[state]].get(char, 0)
+            if out[nxt] == -1:
+                out[nxt] = out[fail[nxt]]
+        for char, nxt in goto[fail[state]].items():
+            goto[state].setdefault(char, nxt)
+    return goto, out
+
+
+part_1_scanner = build_scanner(())
+part_2_scanner = build_scanner(DIGIT_WORDS)
+
+
+def scan_line(line: str, scanner: tuple[list[dict[str, int]], list[int]]) -> int:
+    # No pattern contains another, so the first/last match to end is also the first/last to start
+    goto, out = scanner
+    state = 0
+    first = last = -1
+    for char in line:
+        state = goto[state].get(char, 0)
+        value = out[state]
+        if value != -1:
+            if first == -1:
+                first = value
+            last = value
+    return 0 if first == -1 else first * 10 + last
 
 
 def get_part_1_score(inp: str) -> int:
-    score = 0
-    for line in inp.splitlines():
-        nums = re.findall(r"\d", line)
-        if nums:
-            score += int(nums[0] + nums[-1])
-    return score
+    return sum(scan_line(line, part_1_scanner) for line in inp.splitlines())
 
 
 def get_part_2_score(inp: str) -> int:
-    score = 0
-    for line in inp.splitlines():
-        nums = re.findall(r"(\d|one|two|three|four|five|six|seven|eight|nine)", line, overlapped=True)
-        new_nums = [x.replace("one", "1")\
-    .replace("two", "2")\
-    .replace("three", "3")\
-    .replace("four", "4")\
-    .replace("five", "5")\
-    .replace("six", "6")\
-    .replace("seven", "7")\
-    .replace("eight", "8")\
-    .replace("nine", "9") for x in nums]
-        if new_nums:
-            score += int(new_nums[0] + new_nums[-1])
-    return score
+    return sum(scan_line(line, part_2_scanner) for line in inp.splitlines())
+
+
+ZERO, NINE = ord("0"), ord("9")
+line_re = re.compile(rb"[^\n]+")
+words_by_first_byte: dict[int, list[tuple[bytes, int]]] = {}
+words_by_last_byte: dict[int, list[tuple[bytes, int]]] = {}
+for value, word in enumerate(DIGIT_WORDS, start=1):
+    encoded = word.encode()
+    words_by_first_byte.setdefault(encoded[0], []).append((encoded, value))
+    words_by_last_byte.setdefault(encoded[-1], []).append((encoded, value))
+
+
+def first_digits(view: memoryview, start: int, end: int) -> tuple[int, int]:
+    """Scan forward from start, returning the first (part 1, part 2) digit or -1"""
+    word_digit = -1
+    for idx in range(start, end):
+        byte = view[idx]
+        if ZERO <= byte <= NINE:
+            digit = byte - ZERO
+            return digit, digit if word_digit == -1 else word_digit
+        if word_digit == -1:
+            for word, value in words_by_first_byte.get(byte, ()):
+                if idx + len(word) <= end and view[idx : idx + len(word)] == word:
+                    word_digit = value
+                    break
+    return -1, word_digit
+
+
+def last_digits(view: memoryview, start: int, end: int) -> tuple[int, int]:
+    """Scan backward from end, returning the last (part 1, part 2) digit or -1"""
+    word_digit = -1
+    for idx in range(end - 1, start - 1, -1):
+        byte = view[idx]
+        if ZERO <= byte <= NINE:
+            digit = byte - ZERO
+            return digit, digit if word_digit == -1 else word_digit
+        if word_digit == -1:
+            for word, value in words_by_last_byte.get(byte, ()):
+                word_start = idx + 1 - len(word)
+                if word_start >= start and view[word_start : idx + 1] == word:
+                    word_digit = value
+                    break
+    return -1, word_digit
+
+
+def score_buffer(buf: bytes | memoryview | mmap.mmap) -> tuple[int, int]:
+    """Both part scores from a bytes-like buffer, without decoding or splitting it"""
+    view = memoryview(buf)
+    part_1 = 0
+    part_2 = 0
+    for match in line_re.finditer(view):
+        start, end = match.span()
+        first_1, first_2 = first_digits(view, start, end)
+        if first_2 == -1:
+            continue
+        last_1, last_2 = last_digits(view, start, end)
+        if first_1 != -1:
+            part_1 += first_1 * 10 + last_1
+        part_2 += first_2 * 10 + last_2
+    return part_1, part_2
+
+
+def score_file(path: str) -> tuple[int, int]:
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return 0, 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return score_buffer(mapped)
+
+
+def chunk_bounds(buf: bytes | mmap.mmap, chunk_size: int) -> list[tuple[int, int]]:
+    """Split buf into (start, end) ranges of roughly chunk_size ending on a newline"""
+    bounds = []
+    start = 0
+    while start < len(buf):
+        end = start + chunk_size
+        if end >= len(buf):
+            end = len(buf)
+        else:
+            newline = buf.find(b"\n", end)
+            end = len(buf) if newline == -1 else newline + 1
+        bounds.append((start, end))
+        start = end
+    return bounds
+
+
+def score_file_chunk(job: tuple[str, int, int]) -> tuple[int, int]:
+    path, start, end = job
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            with memoryview(mapped) as view:
+                return score_buffer(view[start:end])
+
+
+def score_file_parallel(
+    path: str, workers: int | None = None, chunk_size: int = 1 << 22
+) -> tuple[int, int]:
+    """Both part scores of a file, scored chunk by chunk in a pool of workers"""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return 0, 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            jobs = [(path, start, end) for start, end in chunk_bounds(mapped, chunk_size)]
+    part_1 = 0
+    part_2 = 0
+    with Pool(workers) as pool:
+        for chunk_1, chunk_2 in pool.imap_unordered(score_file_chunk, jobs):
+            part_1 += chunk_1
+            part_2 += chunk_2
+    return part_1, part_2
+
+
+def benchmark(
+    path: str,
+    worker_counts: tuple[int, ...] = (1, 2, 4, 8),
+    chunk_size: int | None = None,
+) -> None:
+    """Lines/s single-threaded and at each worker count. Without a chunk_size the
+    file is cut into one chunk per worker"""
+    file_size = os.path.getsize(path)
+    with open(path) as f:
+        text = f.read()
+    line_count = len(text.splitlines())
+
+    start = time.perf_counter()
+    expected = (get_part_1_score(text), get_part_2_score(text))
+    elapsed = time.perf_counter() - start
+    print(f"single-threaded: {line_count / elapsed:,.0f} lines/s")
+
+    for workers in worker_counts:
+        size = chunk_size or max(-(-file_size // workers), 1)
+        start = time.perf_counter()
+        assert score_file_parallel(path, workers, size) == expected
+        elapsed = time.perf_counter() - start
+        print(f"{workers} workers: {line_count / elapsed:,.0f} lines/s")
 
 
 if __name__ == "__main__":
+    if sys.argv[1] == "--bench":
+        # day1.py --bench <path> [workers,...] [chunk_size]
+        worker_counts = (1, 2, 4, 8)
+        if len(sys.argv) > 3:
+            worker_counts = tuple(int(x) for x in sys.argv[3].split(","))
+        chunk_size = int(sys.argv[4]) if len(sys.argv) > 4 else None
+        benchmark(sys.argv[2], worker_counts, chunk_size)
+        sys.exit()
     inp = sys.argv[1]
     test_inp = "1abc2\npqr3stu8vwx\na1b2c3d4e5f\ntreb7uchet"
     test_2_inp = "two1nine\neightwothree\nabcone2threexyz\nxtwone3four\n4nineeightseven2\nzoneight234\n7pqrstsixteen"
     assert get_part_1_score(test_inp) == 142
     assert get_part_2_score(test_2_inp) == 281
+    assert get_part_2_score("oneight\nsevenine\nnineeight") == 18 + 79 + 98
+    assert score_buffer(test_inp.encode()) == (142, 142)
+    assert score_buffer(memoryview(test_2_inp.encode()))[1] == 281
     print(get_part_1_score(inp))
     print(f"{get_part_2_score(inp) = }")
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import sys
+from array import array
 from dataclasses import dataclass
 from copy import deepcopy
 from pprint import pprint
@@ -50,51 +51,6 @@ class Coord:
     def __add__(self: Coord, other: Coord) -> Coord:
         return Coord(self.x + other.x, self.y + other.y)
 
-    def enumerate_move_options(
-        self: Coord, grid: dict[Coord, Pipe], explored: set[Coord]
-    ) -> list[Coord]:
-        acc = []
-        # Left
-        left_move = self + Coord(-1, 0)
-        if (
-            left_move in grid
-            and left_move not in explored
-            and grid[self].left
-            and grid[left_move].right
-        ):
-            acc.append(left_move)
-        # Right
-        right_move = self + Coord(1, 0)
-        if (
-            right_move in grid
-            and right_move not in explored
-            and grid[self].right
-            and grid[right_move].left
-        ):
-            acc.append(right_move)
-        # Up
-        up_move = self + Coord(0, -1)
-        if (
-            up_move in grid
-            and up_move not in explored
-            and grid[self].up
-            and grid[up_move].down
-        ):
-            acc.append(up_move)
-        # Down
-        down_move = self + Coord(0, 1)
-        if (
-            down_move in grid
-            and down_move not in explored
-            and grid[self].down
-            and grid[down_move].up
-        ):
-            acc.append(down_move)
-        return acc
-
-    def is_adjacent_to(self: Coord, other: Coord, grid: dict[Coord, Pipe]) -> bool:
-        return other in self.enumerate_move_options(grid, set())
-
 
 class Pipe:
     def __init__(self: Pipe, letter: str):
@@ -165,41 +121,45 @@ def parse_input(inp: str) -> dict[Coord, Pipe]:
     return acc
 
 
-def get_loop_path_rec(
-    curr_path: list[Coord], target: Coord, grid: dict[Coord, Pipe]
-) -> list[Coord] | None:
-    if len(curr_path) > 3 and curr_path[-1].is_adjacent_to(target, grid):
-        return curr_path
-    options = curr_path[-1].enumerate_move_options(grid, set(curr_path))
-    if len(options) == 0:
-        return None
+pipe_connections = {"|": "UD", "-": "LR", "L": "UR", "J": "UL", "7": "LD", "F": "RD"}
+opposite = {"U": "D", "D": "U", "L": "R", "R": "L"}
 
-    for opt in options:
-        path = get_loop_path_rec([*curr_path, opt], target, grid)
-        if path is not None:
-            return path
-    return None
 
+def trace_loop(inp: str) -> tuple[array, int]:
+    """Flat indices of the loop through S, in a grid padded to `stride` columns so
+    stepping off the left or right edge lands on padding"""
+    rows = inp.splitlines()
+    stride = max(len(row) for row in rows) + 1
+    cells = "".join(row.ljust(stride, ".") for row in rows)
+    offsets = {"U": -stride, "D": stride, "L": -1, "R": 1}
+    start = cells.index("S")
 
-def get_loop_path(grid: dict[Coord, Pipe]) -> list[Coord]:
-    start_coord = None
-    for node in grid:
-        if grid[node].is_start:
-            start_coord = node
+    def connects_back(heading: str) -> bool:
+        idx = start + offsets[heading]
+        return 0 <= idx < len(cells) and opposite[heading] in pipe_connections.get(
+            cells[idx], ""
+        )
 
-    path = get_loop_path_rec([start_coord], start_coord, grid)
-    return path
+    heading = next(heading for heading in "URDL" if connects_back(heading))
+    loop = array("i", [start])
+    idx = start + offsets[heading]
+    while idx != start:
+        loop.append(idx)
+        first, second = pipe_connections[cells[idx]]
+        heading = second if first == opposite[heading] else first
+        idx += offsets[heading]
+    return loop, stride
 
 
 def solve_part_1(inp: str) -> int:
-    grid: dict[Coord, Pipe] = parse_input(inp)
-    path = get_loop_path(grid)
-    return len(path) // 2
+    loop, _ = trace_loop(inp)
+    return len(loop) // 2
 
 
 def solve_part_2(inp: str) -> int:
     grid: dict[Coord, Pipe] = parse_input(inp)
-    loop_coords = set(get_loop_path(grid))
+    loop, stride = trace_loop(inp)
+    loop_coords = {Coord(idx % stride, idx // stride) for idx in loop}
     move_left = Coord(-1, 0)
     trapped_cnt = 0
     trapped_set = set()
@@ -239,7 +199,6 @@ def solve_part_2(inp: str) -> int:
 
 
 if __name__ == "__main__":
-    sys.setrecursionlimit(1000000)
     assert solve_part_1(test_inp) == 4
     assert solve_part_1(test_inp_2) == 8
     assert solve_part_2(test_inp_3) == 8
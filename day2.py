@@ -1,56 +1,118 @@
 #!/usr/bin/env python3
 import sys
 import re
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+import numpy as np
 
+draw_regex = re.compile(r"(\d+) (red|green|blue)")
 
-def solve_part_1(inp: str) -> int:
-    acc = 0
-    red_reg = re.compile(r".*\s(\d+) red.*")
-    green_reg = re.compile(r".*\s(\d+) green.*")
-    blue_reg = re.compile(r".*\s(\d+) blue.*")
+
+@dataclass(frozen=True)
+class Game:
+    id: int
+    red: int
+    green: int
+    blue: int
+
+
+def parse_game(line: str) -> Game:
+    """Read each `N colour` pair once, keeping the per-colour maximum"""
+    game_s, rest = line.split(":")
+    maxima = {"red": 0, "green": 0, "blue": 0}
+    for match in draw_regex.finditer(rest):
+        count = int(match.group(1))
+        if count > maxima[match.group(2)]:
+            maxima[match.group(2)] = count
+    return Game(int(game_s[5:]), maxima["red"], maxima["green"], maxima["blue"])
+
+
+def score_game(game: Game) -> tuple[int, int]:
+    """The game's contribution to the valid-id sum and to the power sum"""
+    is_valid = game.red <= 12 and game.green <= 13 and game.blue <= 14
+    return game.id if is_valid else 0, game.red * game.green * game.blue
+
+
+def solve(inp: str) -> tuple[int, int]:
+    valid_acc = 0
+    power_acc = 0
     for line in inp.splitlines():
-        game_s, rest = line.split(":")
-        game = int(game_s.replace("Game ", ""))
-        sub_games = rest.split(";")
-        game_is_valid = True
-        for sub in sub_games:
-            red_match = red_reg.match(sub)
-            red_cnt = int(red_match.group(1)) if red_match else 0
-            green_match = green_reg.match(sub)
-            green_cnt = int(green_match.group(1)) if green_match else 0
-            blue_match = blue_reg.match(sub)
-            blue_cnt = int(blue_match.group(1)) if blue_match else 0
-            if red_cnt > 12 or green_cnt > 13 or blue_cnt > 14:
-                game_is_valid = False
-        if game_is_valid:
-            acc += game
-    return acc
+        valid, power = score_game(parse_game(line))
+        valid_acc += valid
+        power_acc += power
+    return valid_acc, power_acc
+
+
+def stream_totals(
+    lines: Iterable[str], checkpoint_every: int = 1000
+) -> Iterator[tuple[int, int, int]]:
+    """Yield (games seen, valid-id sum, power sum) every checkpoint_every games
+    and once more at the end of the feed"""
+    game_count = 0
+    valid_acc = 0
+    power_acc = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        valid, power = score_game(parse_game(line))
+        valid_acc += valid
+        power_acc += power
+        game_count += 1
+        if game_count % checkpoint_every == 0:
+            yield game_count, valid_acc, power_acc
+    if game_count % checkpoint_every != 0:
+        yield game_count, valid_acc, power_acc
+
+
+def solve_part_1(inp: str) -> int:
+    return solve(inp)[0]
 
 
 def solve_part_2(inp: str) -> int:
-    acc = 0
-    red_reg = re.compile(r".*\s(\d+) red.*")
-    green_reg = re.compile(r".*\s(\d+) green.*")
-    blue_reg = re.compile(r".*\s(\d+) blue.*")
-    for line in inp.splitlines():
-        game_s, rest = line.split(":")
-        game = int(game_s.replace("Game ", ""))
-        sub_games = rest.split(";")
-        red_min = 0
-        green_min = 0
-        blue_min = 0
-        for sub in sub_games:
-            red_match = red_reg.match(sub)
-            red_cnt = int(red_match.group(1)) if red_match else 0
-            green_match = green_reg.match(sub)
-            green_cnt = int(green_match.group(1)) if green_match else 0
-            blue_match = blue_reg.match(sub)
-            blue_cnt = int(blue_match.group(1)) if blue_match else 0
-            red_min = max(red_min, red_cnt)
-            green_min = max(green_min, green_cnt)
-            blue_min = max(blue_min, blue_cnt)
-        acc += red_min * blue_min * green_min
-    return acc
+    return solve(inp)[1]
+
+
+@dataclass(frozen=True)
+class GameStore:
+    """Parsed games as columns, so new bag limits never need a re-parse"""
+
+    ids: np.ndarray
+    red: np.ndarray
+    green: np.ndarray
+    blue: np.ndarray
+
+    @classmethod
+    def from_log(cls, inp: str) -> "GameStore":
+        games = [parse_game(line) for line in inp.splitlines()]
+        return cls(
+            np.array([game.id for game in games], dtype=np.int64),
+            np.array([game.red for game in games], dtype=np.int64),
+            np.array([game.green for game in games], dtype=np.int64),
+            np.array([game.blue for game in games], dtype=np.int64),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "GameStore":
+        with np.load(path) as data:
+            return cls(data["ids"], data["red"], data["green"], data["blue"])
+
+    def save(self, path: str) -> None:
+        with open(path, "wb") as f:
+            np.savez(f, ids=self.ids, red=self.red, green=self.green, blue=self.blue)
+
+    def valid_id_sums(self, limits: np.ndarray) -> np.ndarray:
+        """Valid-id sum for each (red, green, blue) row of a (k, 3) limits array"""
+        limits = np.asarray(limits, dtype=np.int64).reshape(-1, 3)
+        mask = (
+            (self.red <= limits[:, 0, None])
+            & (self.green <= limits[:, 1, None])
+            & (self.blue <= limits[:, 2, None])
+        )
+        return mask.astype(np.int64) @ self.ids
+
+    def power_sum(self) -> int:
+        return int((self.red * self.green * self.blue).sum())
 
 
 test_part_1 = "Game 1: 3 blue, 4 red; 1 red, 2 green, 6 blue; 2 green\n\
@@ -61,7 +123,18 @@ Game 5: 6 red, 1 blue, 3 green; 2 blue, 1 red, 2 green"
 
 
 if __name__ == "__main__":
+    if sys.argv[1] == "--stream":
+        feed = open(sys.argv[2]) if len(sys.argv) > 2 else nullcontext(sys.stdin)
+        with feed as lines:
+            for checkpoint in stream_totals(lines):
+                print(checkpoint, flush=True)
+        sys.exit()
+    checkpoints = list(stream_totals(test_part_1.splitlines(), 3))
+    assert checkpoints == [(3, 3, 1620), (5, 8, 2286)]
     print(f"{solve_part_1(test_part_1) = }")
+    store = GameStore.from_log(test_part_1)
+    assert store.valid_id_sums([(12, 13, 14), (20, 20, 20)]).tolist() == [8, 15]
+    assert store.power_sum() == 2286
     inp = sys.argv[1]
     print(solve_part_1(inp))
 
@@ -1,7 +1,16 @@
 #!/usr/bin/env python3
+from __future__ import annotations
+
 import sys
+import random
+import time
+from array import array
+from bisect import bisect_right
+from contextlib import nullcontext
+from typing import Iterable, Iterator
 from dataclasses import dataclass
 import re
+import numpy as np
 
 test_inp = """467..114..
 ...*......
@@ -29,23 +38,6 @@ class Num:
     value: int
     coords: frozenset[Coord]
 
-    def is_adjacent_to_symbol(self, symbol_list: set[Coord]) -> bool:
-        for coord in self.coords:
-            for adj_delta in (
-                Coord(-1, -1),
-                Coord(-1, 0),
-                Coord(-1, 1),
-                Coord(0, -1),
-                Coord(0, 1),
-                Coord(1, -1),
-                Coord(1, 0),
-                Coord(1, 1),
-            ):
-                new_coord = coord + adj_delta
-                if new_coord in symbol_list:
-                    return True
-        return False
-
 
 def pretty_print_grid(grid: str, nums: list[Num], symbols: set[Coord]) -> None:
     RED = "\033[0;31m"
@@ -65,74 +57,201 @@ def pretty_print_grid(grid: str, nums: list[Num], symbols: set[Coord]) -> None:
         print("")
 
 
+num_regex = re.compile(r"\d+", re.ASCII)
+symbol_regex = re.compile(r"[^\d.]", re.ASCII)
+
+
+@dataclass
+class NumberIndex:
+    """Every cell of the schematic mapped to the id of the number covering it, or -1"""
+
+    width: int
+    height: int
+    cells: array
+    values: list[int]
+
+    @classmethod
+    def from_schematic(cls, rows: list[str]) -> NumberIndex:
+        width = max((len(row) for row in rows), default=0)
+        cells = array("i", [-1]) * (width * len(rows))
+        values: list[int] = []
+        for y, row in enumerate(rows):
+            for match in num_regex.finditer(row):
+                start, end = y * width + match.start(), y * width + match.end()
+                cells[start:end] = array("i", [len(values)]) * (end - start)
+                values.append(int(match.group(0)))
+        return cls(width, len(rows), cells, values)
+
+    def adjacent_number_ids(self, x: int, y: int) -> set[int]:
+        acc = set()
+        for adj_y in range(max(y - 1, 0), min(y + 2, self.height)):
+            row_start = adj_y * self.width
+            for adj_x in range(max(x - 1, 0), min(x + 2, self.width)):
+                num_id = self.cells[row_start + adj_x]
+                if num_id != -1:
+                    acc.add(num_id)
+        return acc
+
+
+def load_grid(rows: list[str]) -> np.ndarray:
+    width = max((len(row) for row in rows), default=0)
+    padded = "".join(row.ljust(width, ".") for row in rows)
+    return np.frombuffer(padded.encode(), dtype=np.uint8).reshape(len(rows), width)
+
+
+def dilate(mask: np.ndarray) -> np.ndarray:
+    """Grow a boolean mask into its 3x3 neighbourhood, one axis at a time"""
+    tall = mask.copy()
+    tall[1:, :] |= mask[:-1, :]
+    tall[:-1, :] |= mask[1:, :]
+    wide = tall.copy()
+    wide[:, 1:] |= tall[:, :-1]
+    wide[:, :-1] |= tall[:, 1:]
+    return wide
+
+
 def solve_part_1(inp: str) -> int:
-    num_regex = re.compile(r"\d+", re.ASCII)
-    non_symbol_chars = {"0", "1", "2", "3", "4", "5", "6", "7", "8", "9", "."}
-    symbols: set[Coord] = set()
-    nums: list[Num] = []
-    for y, line in enumerate(inp.split("\n")):
-        matches = num_regex.finditer(line)
-        for match in matches:
-            nums.append(
-                Num(
-                    int(match.group(0)),
-                    frozenset(
-                        {Coord(idx, y) for idx in range(match.start(0), match.end(0))}
-                    ),
-                )
-            )
+    rows = inp.splitlines()
+    grid = load_grid(rows)
+    is_digit = (grid >= ord("0")) & (grid <= ord("9"))
+    near_symbol = dilate(~is_digit & (grid != ord(".")))
+    # A number starts at a digit with no digit to its left; counting starts labels them
+    starts = is_digit.copy()
+    starts[:, 1:] &= ~is_digit[:, :-1]
+    labels = np.cumsum(starts.ravel()).reshape(grid.shape)
+    values = [int(match.group(0)) for row in rows for match in num_regex.finditer(row)]
+    is_part = np.bincount(labels[is_digit & near_symbol], minlength=len(values) + 1)
+    return sum(values[num_id] for num_id in np.flatnonzero(is_part[1:]))
+
+
+def solve_part_1_indexed(inp: str) -> int:
+    rows = inp.splitlines()
+    index = NumberIndex.from_schematic(rows)
+    is_part = bytearray(len(index.values))
+    for y, row in enumerate(rows):
+        for match in symbol_regex.finditer(row):
+            for num_id in index.adjacent_number_ids(match.start(), y):
+                is_part[num_id] = 1
+    return sum(value for value, flag in zip(index.values, is_part) if flag)
 
-        for x, char in enumerate(line):
-            if char not in non_symbol_chars:
-                symbols.add(Coord(x, y))
 
+def solve_part_2(inp: str) -> int:
+    rows = inp.splitlines()
+    index = NumberIndex.from_schematic(rows)
     to_ret = 0
-    for num in nums:
-        if num.is_adjacent_to_symbol(symbols):
-            to_ret += num.value
+    for y, row in enumerate(rows):
+        x = row.find("*")
+        while x != -1:
+            num_ids = index.adjacent_number_ids(x, y)
+            if len(num_ids) == 2:
+                first, second = num_ids
+                to_ret += index.values[first] * index.values[second]
+            x = row.find("*", x + 1)
     return to_ret
 
 
-def gear_to_num(gear: Coord, nums: list[Num]) -> int:
-    gear_set = set([gear])
-    if len([num for num in nums if num.is_adjacent_to_symbol(gear_set)]) != 2:
-        return 0
-    acc = 1
-    for num in nums:
-        if num.is_adjacent_to_symbol(gear_set):
-            acc *= num.value
-    return acc
+Row = tuple[str, list[tuple[int, int, int]]]
+EMPTY_ROW: Row = ("", [])
 
 
-def solve_part_2(inp: str) -> int:
-    num_regex = re.compile(r"\d+", re.ASCII)
-    gears: set[Coord] = set()
-    nums: list[Num] = []
-    for y, line in enumerate(inp.split("\n")):
-        matches = num_regex.finditer(line)
-        for match in matches:
-            nums.append(
-                Num(
-                    int(match.group(0)),
-                    frozenset(
-                        {Coord(idx, y) for idx in range(match.start(0), match.end(0))}
-                    ),
-                )
-            )
+def read_row(line: str) -> Row:
+    line = line.rstrip("\n")
+    return line, [
+        (match.start(), match.end(), int(match.group(0)))
+        for match in num_regex.finditer(line)
+    ]
 
-        for x, char in enumerate(line):
-            if char == "*":
-                gears.add(Coord(x, y))
 
-    to_ret = 0
-    for gear in gears:
-        to_ret += gear_to_num(gear, nums)
-    return to_ret
+def numbers_touching(row: Row, x: int) -> Iterator[int]:
+    """Values of the numbers in row covering x - 1, x or x + 1"""
+    numbers = row[1]
+    idx = bisect_right(numbers, x + 1, key=lambda num: num[0]) - 1
+    while idx >= 0 and numbers[idx][1] >= x:
+        yield numbers[idx][2]
+        idx -= 1
+
+
+def row_contribution(above: Row, current: Row, below: Row) -> tuple[int, int]:
+    part_acc = 0
+    for start, end, value in current[1]:
+        lo = max(start - 1, 0)
+        if any(
+            symbol_regex.search(row[0], lo, end + 1) for row in (above, current, below)
+        ):
+            part_acc += value
+    gear_acc = 0
+    x = current[0].find("*")
+    while x != -1:
+        touching = [
+            value
+            for row in (above, current, below)
+            for value in numbers_touching(row, x)
+        ]
+        if len(touching) == 2:
+            gear_acc += touching[0] * touching[1]
+        x = current[0].find("*", x + 1)
+    return part_acc, gear_acc
+
+
+def stream_contributions(lines: Iterable[str]) -> Iterator[tuple[int, int]]:
+    """Yield each row's (part number sum, gear ratio sum) as soon as the row below it
+    has been read, keeping only three rows in memory"""
+    above, current = EMPTY_ROW, None
+    for line in lines:
+        below = read_row(line)
+        if current is not None:
+            yield row_contribution(above, current, below)
+            above = current
+        current = below
+    if current is not None:
+        yield row_contribution(above, current, EMPTY_ROW)
+
+
+def solve_streaming(lines: Iterable[str]) -> tuple[int, int]:
+    part_acc = 0
+    gear_acc = 0
+    for part, gear in stream_contributions(lines):
+        part_acc += part
+        gear_acc += gear
+    return part_acc, gear_acc
+
+
+def random_schematic(width: int, height: int) -> str:
+    rows = []
+    for _ in range(height):
+        row = ""
+        while len(row) < width:
+            row += random.choice(("...", "*", "#", "+", f"{random.randint(1, 999)}."))
+        rows.append(row[:width])
+    return "\n".join(rows)
+
+
+def benchmark(sizes: tuple[int, ...] = (100, 300, 1000, 3000)) -> None:
+    for size in sizes:
+        schematic = random_schematic(size, size)
+        start = time.perf_counter()
+        expected = solve_part_1_indexed(schematic)
+        indexed_time = time.perf_counter() - start
+        start = time.perf_counter()
+        assert solve_part_1(schematic) == expected
+        numpy_time = time.perf_counter() - start
+        print(f"{size}x{size}: indexed {indexed_time:.3f}s, numpy {numpy_time:.3f}s")
 
 
 if __name__ == "__main__":
+    if sys.argv[1] == "--bench":
+        benchmark()
+        sys.exit()
+    if sys.argv[1] == "--stream":
+        feed = open(sys.argv[2]) if len(sys.argv) > 2 else nullcontext(sys.stdin)
+        with feed as lines:
+            print(f"{solve_streaming(lines) = }")
+        sys.exit()
     inp = sys.argv[1]
     assert solve_part_1(test_inp) == 4361
+    assert solve_part_1_indexed(test_inp) == 4361
+    assert solve_part_1("1" * 25 + "*") == int("1" * 25)
     assert solve_part_2(test_inp) == 467835
+    assert solve_streaming(test_inp.splitlines()) == (4361, 467835)
     print(f"{solve_part_1(inp) = }")
     print(f"{solve_part_2(inp) = }")
@@ -2,6 +2,11 @@
 
 import sys
 import re
+import random
+import time
+from contextlib import nullcontext
+from typing import Iterable, Sequence
+import numpy as np
 
 test_inp = """Card 1: 41 48 83 86 17 | 83 86  6 31 17  9 48 53
 Card 2: 13 32 20 16 61 | 61 30 68 82 17 32 24 19
@@ -10,43 +15,111 @@ Card 4: 41 92 73 84 69 | 59 84 76 51 58  5 54 83
 Card 5: 87 83 26 28 32 | 88 30 70 12 93 22 82 36
 Card 6: 31 18 13 56 72 | 74 77 10 23 35 67 36 11"""
 
+nums_regex = re.compile(r"\d+")
+low_word = (1 << 64) - 1
+
+def parse_card(line: str) -> tuple[int, int]:
+    """Winning and held numbers as bitmasks, bit n set for number n"""
+    _, rest = line.split(":")
+    lhs, rhs = rest.split("|")
+    winning_mask = 0
+    for num in nums_regex.findall(lhs):
+        winning_mask |= 1 << int(num)
+    held_mask = 0
+    for num in nums_regex.findall(rhs):
+        held_mask |= 1 << int(num)
+    return winning_mask, held_mask
+
+
+def match_counts(inp: str) -> np.ndarray:
+    """Matches per card, from popcounts of two-word (numbers < 128) bitmasks"""
+    words = [
+        (winning & low_word, winning >> 64, held & low_word, held >> 64)
+        for winning, held in map(parse_card, inp.splitlines())
+    ]
+    masks = np.array(words, dtype=np.uint64).reshape(-1, 4)
+    both = masks[:, :2] & masks[:, 2:]
+    return np.bitwise_count(both).sum(axis=1, dtype=np.int64)
+
+
 def solve_part_1(inp: str) -> int:
-    nums_regex = re.compile(r"\d+")
-    acc = 0
-    for card_number, line in enumerate(inp.splitlines(), start=1):
-        _, rest = line.split(":")
-        lhs, rhs = rest.split("|")
-        winning_nums = nums_regex.findall(lhs)
-        scratch_nums = nums_regex.findall(rhs)
-        to_add = 0
-        for scratch in scratch_nums:
-            if scratch in winning_nums:
-                to_add = 1 if to_add == 0 else to_add * 2
-        acc += to_add
-    print(acc)
-    return acc
+    return sum((1 << count) >> 1 for count in match_counts(inp).tolist())
+
+
+def total_cards(counts: Sequence[int]) -> int:
+    """Cards held once every copy is won, pushing copies through a difference array"""
+    deck_size = len(counts)
+    diff = [0] * (deck_size + 1)
+    extra_copies = 0
+    total = 0
+    for card_idx, win_count in enumerate(counts):
+        extra_copies += diff[card_idx]
+        copies = 1 + extra_copies
+        total += copies
+        if win_count:
+            diff[card_idx + 1] += copies
+            diff[min(card_idx + 1 + win_count, deck_size)] -= copies
+    return total
+
 
 def solve_part_2(inp: str) -> int:
-    nums_regex = re.compile(r"\d+")
-    count_dict: dict[int, int] = {
-        x+1:1 for x in range(len(inp.splitlines())) 
-    }
-    for card_number, line in enumerate(inp.splitlines(), start=1):
-        _, rest = line.split(":")
-        lhs, rhs = rest.split("|")
-        winning_nums = nums_regex.findall(lhs)
-        scratch_nums = nums_regex.findall(rhs)
-        win_count = 0
-        for scratch in scratch_nums:
-            if scratch in winning_nums:
-                win_count += 1
-        for x in range(1, win_count + 1):
-            count_dict[x+ card_number] += count_dict[card_number]
-    return sum(count_dict.values())
+    return total_cards(match_counts(inp).tolist())
+
+
+def stream_totals(lines: Iterable[str]) -> tuple[int, int]:
+    """Both part totals from cards read one at a time, with pending copies kept as
+    differences in a ring buffer sized to the most matches any card has had"""
+    ring = [0]
+    head = 0
+    extra_copies = 0
+    points = 0
+    total = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        winning, held = parse_card(line)
+        win_count = (winning & held).bit_count()
+        if win_count + 1 > len(ring):
+            ring = ring[head:] + ring[:head] + [0] * (win_count + 1 - len(ring))
+            head = 0
+        extra_copies += ring[head]
+        ring[head] = 0
+        copies = 1 + extra_copies
+        total += copies
+        points += (1 << win_count) >> 1
+        if win_count:
+            ring[(head + 1) % len(ring)] += copies
+            ring[(head + 1 + win_count) % len(ring)] -= copies
+        head = (head + 1) % len(ring)
+    return points, total
+
+
+def benchmark(sizes: tuple[int, ...] = (10**5, 10**6, 10**7)) -> None:
+    for size in sizes:
+        # Wins never cross a block of ten cards, so copy counts stay small
+        counts = [random.randint(0, 9 - idx % 10) for idx in range(size)]
+        start = time.perf_counter()
+        total_cards(counts)
+        elapsed = time.perf_counter() - start
+        print(f"{size:,} cards: {size / elapsed:,.0f} cards/s")
+
 
 if __name__ == "__main__":
+    if sys.argv[1] == "--bench":
+        benchmark()
+        sys.exit()
+    if sys.argv[1] == "--stream":
+        feed = open(sys.argv[2]) if len(sys.argv) > 2 else nullcontext(sys.stdin)
+        with feed as lines:
+            print(f"{stream_totals(lines) = }")
+        sys.exit()
     inp = sys.argv[1]
     assert solve_part_1(test_inp) == 13
     assert solve_part_2(test_inp) == 30
+    assert total_cards([4, 2, 2, 1, 0, 0]) == 30
+    assert stream_totals(test_inp.splitlines()) == (13, 30)
+    wide_card = "Card 1: " + " ".join(map(str, range(1, 71)))
+    wide_card += " | " + " ".join(map(str, range(1, 71)))
+    assert solve_part_1(wide_card) == 1 << 69
     print(f"{solve_part_1(inp) = }")
     print(f"{solve_part_2(inp) = }")
\ No newline at end of file
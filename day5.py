@@ -1,6 +1,18 @@
 #!/usr/bin/env python3
+from __future__ import annotations
+
 import sys
+import os
 import re
+import json
+import hashlib
+import random
+import time
+from bisect import bisect_right
+from itertools import pairwise
+from dataclasses import dataclass
+from typing import Iterator
+import numpy as np
 from pprint import pprint
 
 test_inp = """seeds: 79 14 55 13
@@ -43,6 +55,21 @@ def array_chunk(list, size):
         yield list[i : i + size]
 
 
+DOMAIN_END = 1 << 63
+
+
+def parse_almanac(inp: str) -> tuple[list[int], list[list[list[int]]]]:
+    ints_re = re.compile(r"\d+")
+    seeds_s, rest = inp.split("seed-to-soil map:")
+    maps_s = rest.split("\n\n")
+    seeds = [int(x) for x in ints_re.findall(seeds_s)]
+    map_vals = [
+        [bla for bla in array_chunk([int(y) for y in ints_re.findall(x)], 3)]
+        for x in maps_s
+    ]
+    return seeds, map_vals
+
+
 def part_1_steps_rec(inps: set[int], maps: list[tuple[int]], depth) -> int:
     acc = set()
     for inp in inps:
@@ -55,58 +82,169 @@ def part_1_steps_rec(inps: set[int], maps: list[tuple[int]], depth) -> int:
                     inp_mapped = True
         if not inp_mapped:
             acc.add(inp)
-    if depth == 6:
+    if depth == len(maps) - 1:
         return min(acc)
     return part_1_steps_rec(acc, maps, depth + 1)
 
 
+def sorted_rules(triples: list[list[int]]) -> list[tuple[int, int, int]]:
+    """A map layer as (source start, source end, offset), ordered by source start"""
+    return sorted(
+        (source_start, source_start + map_range, dest_start - source_start)
+        for dest_start, source_start, map_range in triples
+    )
+
+
+def split_interval(
+    start: int, end: int, rules: list[tuple[int, int, int]]
+) -> Iterator[tuple[int, int, int]]:
+    """Pieces (start, end, offset) of [start, end) under one layer, in order"""
+    idx = bisect_right(rules, start, key=lambda rule: rule[1])
+    while start < end:
+        if idx == len(rules) or rules[idx][0] >= end:
+            yield start, end, 0
+            return
+        rule_start, rule_end, offset = rules[idx]
+        if start < rule_start:
+            yield start, rule_start, 0
+            start = rule_start
+        cut = min(end, rule_end)
+        yield start, cut, offset
+        start = cut
+        idx += 1
+
+
+def merge_intervals(intervals: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    acc: list[tuple[int, int]] = []
+    for start, end in sorted(intervals):
+        if acc and start <= acc[-1][1]:
+            acc[-1] = (acc[-1][0], max(acc[-1][1], end))
+        else:
+            acc.append((start, end))
+    return acc
+
+
+def map_intervals(
+    intervals: list[tuple[int, int]], rules: list[tuple[int, int, int]]
+) -> list[tuple[int, int]]:
+    """Push half-open intervals through one layer, splitting them at rule edges"""
+    return merge_intervals(
+        [
+            (lo + offset, hi + offset)
+            for start, end in intervals
+            for lo, hi, offset in split_interval(start, end, rules)
+        ]
+    )
+
+
+@dataclass(frozen=True)
+class CompositeMap:
+    """Every layer folded into one sorted table of (source start, end, offset)
+    segments covering [0, DOMAIN_END)"""
+
+    segments: list[tuple[int, int, int]]
+
+    @classmethod
+    def compile(cls, map_vals: list[list[list[int]]]) -> CompositeMap:
+        segments = [(0, DOMAIN_END, 0)]
+        for triples in map_vals:
+            rules = sorted_rules(triples)
+            layered = []
+            for start, end, offset in segments:
+                for lo, hi, layer_offset in split_interval(
+                    start + offset, end + offset, rules
+                ):
+                    total = offset + layer_offset
+                    if layered and layered[-1][2] == total:
+                        layered[-1] = (layered[-1][0], hi - offset, total)
+                    else:
+                        layered.append((lo - offset, hi - offset, total))
+            segments = layered
+        return cls(segments)
+
+    @classmethod
+    def from_almanac(cls, inp: str, cache_dir: str | None = None) -> CompositeMap:
+        """Compile the maps of an almanac, reusing a copy cached under cache_dir
+        by the hash of the map text if there is one"""
+        _, map_vals = parse_almanac(inp)
+        if cache_dir is None:
+            return cls.compile(map_vals)
+        maps_s = inp.split("seed-to-soil map:")[1]
+        digest = hashlib.sha256(maps_s.encode()).hexdigest()
+        path = os.path.join(cache_dir, f"day5-{digest}.json")
+        if os.path.exists(path):
+            with open(path) as f:
+                return cls([tuple(segment) for segment in json.load(f)])
+        composite = cls.compile(map_vals)
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(composite.segments, f)
+        return composite
+
+    def lookup(self, seed: int) -> int:
+        idx = bisect_right(self.segments, seed, key=lambda segment: segment[0]) - 1
+        return seed + self.segments[idx][2]
+
+
+def map_seed_batch(seeds: np.ndarray, map_vals: list[list[list[int]]]) -> np.ndarray:
+    """Locations for an int64 array of seeds, one searchsorted per layer"""
+    locations = np.asarray(seeds, dtype=np.int64)
+    for triples in map_vals:
+        segments = list(split_interval(0, DOMAIN_END, sorted_rules(triples)))
+        starts = np.array([segment[0] for segment in segments], dtype=np.int64)
+        offsets = np.array([segment[2] for segment in segments], dtype=np.int64)
+        locations = locations + offsets[np.searchsorted(starts, locations, "right") - 1]
+    return locations
+
+
 def solve_part_1(inp: str) -> int:
-    ints_re = re.compile(r"\d+")
-    seeds_s, rest = inp.split("seed-to-soil map:")
-    maps_s = rest.split("\n\n")
-    seeds = set([int(x) for x in ints_re.findall(seeds_s)])
-    map_vals = [
-        [bla for bla in array_chunk([int(y) for y in ints_re.findall(x)], 3)]
-        for x in maps_s
-    ]
-    return part_1_steps_rec(seeds, map_vals, 0)
-
-
-def part_2_steps_rec(
-    inp: int, maps: list[tuple[int]], depth, seed_pairs: tuple[int, int]
-) -> bool:
-    if depth == -1:
-        return any(inp in range(seed[0], seed[0] + seed[1]) for seed in seed_pairs)
-    val = None
-    inp_mapped = False
-    for triple in maps[depth]:
-        dest_start, source_start, map_range = triple
-        if inp in range(dest_start, dest_start + map_range):
-            val = inp + source_start - dest_start
-            inp_mapped = True
-    if not inp_mapped:
-        val = inp
-    return part_2_steps_rec(val, maps, depth - 1, seed_pairs)
+    seeds, map_vals = parse_almanac(inp)
+    composite = CompositeMap.compile(map_vals)
+    return min(composite.lookup(seed) for seed in seeds)
 
 
 def solve_part_2(inp: str) -> int:
-    ints_re = re.compile(r"\d+")
-    seeds_s, rest = inp.split("seed-to-soil map:")
-    maps_s = rest.split("\n\n")
-    seed_pairs = [x for x in array_chunk([int(y) for y in ints_re.findall(seeds_s)], 2)]
-    map_vals = [
-        [bla for bla in array_chunk([int(y) for y in ints_re.findall(x)], 3)]
-        for x in maps_s
-    ]
-    guess = 0
-    while True:
-        if part_2_steps_rec(guess, map_vals, 6, seed_pairs):
-            return guess
-        guess += 1
+    seeds, map_vals = parse_almanac(inp)
+    intervals = merge_intervals(
+        [(start, start + length) for start, length in array_chunk(seeds, 2)]
+    )
+    for triples in map_vals:
+        intervals = map_intervals(intervals, sorted_rules(triples))
+    return intervals[0][0]
+
+
+def benchmark(rules_per_layer: int = 40) -> None:
+    span = 1 << 32
+    map_vals = []
+    for _ in range(7):
+        cuts = sorted(random.sample(range(1, span), rules_per_layer))
+        map_vals.append(
+            [
+                [random.randrange(span), start, end - start]
+                for start, end in pairwise(cuts)
+            ]
+        )
+    for size in (10**4, 10**5, 10**6):
+        seeds = np.random.randint(0, span, size=size, dtype=np.int64)
+        start = time.perf_counter()
+        expected = int(map_seed_batch(seeds, map_vals).min())
+        elapsed = time.perf_counter() - start
+        print(f"{size:,} seeds: numpy {size / elapsed:,.0f} seeds/s", end="")
+        if size <= 10**5:
+            start = time.perf_counter()
+            assert part_1_steps_rec(set(seeds.tolist()), map_vals, 0) == expected
+            elapsed = time.perf_counter() - start
+            print(f", recursive {size / elapsed:,.0f} seeds/s", end="")
+        print()
 
 
 if __name__ == "__main__":
+    if sys.argv[1] == "--bench":
+        benchmark()
+        sys.exit()
     assert solve_part_1(test_inp) == 35
+    test_seeds, test_maps = parse_almanac(test_inp)
+    assert map_seed_batch(np.array(test_seeds), test_maps).tolist() == [82, 43, 86, 35]
     inp = sys.argv[1]
     print(f"{solve_part_1(inp) = }")
     assert solve_part_2(test_inp) == 46
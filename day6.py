@@ -2,6 +2,8 @@
 
 import sys
 import re
+import math
+from typing import Iterable
 from pprint import pprint
 from functools import reduce
 
@@ -11,38 +13,37 @@ Distance:  9  40  200"""
 num_regex = re.compile(r"\d+")
 
 
+def count_wins(race_time: int, race_dist: int) -> int:
+    """Hold times beating race_dist, from the roots of h * (race_time - h) = race_dist"""
+    disc = race_time * race_time - 4 * race_dist
+    if disc <= 0:
+        return 0
+    hold = (race_time - math.isqrt(disc)) // 2
+    while hold * (race_time - hold) <= race_dist and 2 * hold < race_time:
+        hold += 1
+    if hold * (race_time - hold) <= race_dist:
+        return 0
+    while hold > 0 and (hold - 1) * (race_time - hold + 1) > race_dist:
+        hold -= 1
+    return race_time - 2 * hold + 1
+
+
+def count_wins_batch(races: Iterable[tuple[int, int]]) -> list[int]:
+    return [count_wins(race_time, race_dist) for race_time, race_dist in races]
+
+
 def solve_part_1(inp: str) -> int:
     lines = inp.splitlines()
     times = [int(x) for x in num_regex.findall(lines[0])]
     distances = [int(x) for x in num_regex.findall(lines[1])]
-    races = [(times[x], distances[x]) for x in range(0, len(times))]
-    acc = []
-    for race in races:
-        race_win_count = 0
-        race_time, race_dist = race
-        for hold_time in range(0, race_time):
-            if hold_time * (race_time - hold_time) > race_dist:
-                race_win_count += 1
-        acc.append(race_win_count)
-    return reduce(lambda x, y: x * y, acc)
+    return reduce(lambda x, y: x * y, count_wins_batch(zip(times, distances)))
 
 
 def solve_part_2(inp: str) -> int:
     lines = inp.splitlines()
     time = int(reduce(lambda x, y: f"{x}{y}", num_regex.findall(lines[0])))
     distance = int(reduce(lambda x, y: f"{x}{y}", num_regex.findall(lines[1])))
-    race = (time, distance)
-    acc = 0
-    race_time, race_dist = race
-    have_started_winning = False
-    for hold_time in range(0, race_time):
-        if hold_time * (race_time - hold_time) > race_dist:
-            have_started_winning = True
-            acc += 1
-        else:
-            if have_started_winning:
-                break
-    return acc
+    return count_wins(time, distance)
 
 
 if __name__ == "__main__":
@@ -50,4 +51,5 @@ if __name__ == "__main__":
     assert solve_part_1(test_inp) == 288
     print(f"{solve_part_1(inp) = }")
     assert solve_part_2(test_inp) == 71503
+    assert count_wins_batch([(7, 9), (15, 40), (30, 200), (4, 4)]) == [4, 8, 9, 0]
     print(f"{solve_part_2(inp) = }")
@@ -1,6 +1,16 @@
 #!/usr/bin/env python3
 
+from __future__ import annotations
+
 import sys
+import os
+import heapq
+import tempfile
+from array import array
+from itertools import islice
+from operator import itemgetter
+from typing import Iterator
+import numpy as np
 
 test_inp = """32T3K 765
 T55J5 684
@@ -40,101 +50,146 @@ score_map_2 = {
     "J": 1,
 }
 
-labels = "AKQJT98765432"
-
-
-def get_significant_score(hand: str) -> int:
-    acc = [hand.count(char) for char in labels if hand.count(char) != 0]
-    acc.sort()
-    match acc:
-        case [5]:
-            return 7_000_000
-        case [1, 4]:
-            return 6_000_000
-        case [2, 3]:
-            return 5_000_000
-        case [1, 1, 3]:
-            return 4_000_000
-        case [1, 2, 2]:
-            return 3_000_000
-        case [1, 1, 1, 2]:
-            return 2_000_000
-    return 1_000_000
+# Sorted group sizes of a hand to its type rank, high card = 0 up to five of a kind = 6
+hand_types = {
+    (1, 1, 1, 1, 1): 0,
+    (1, 1, 1, 2): 1,
+    (1, 2, 2): 2,
+    (1, 1, 3): 3,
+    (2, 3): 4,
+    (1, 4): 5,
+    (5,): 6,
+}
 
 
-def hand_to_score(hand: str) -> int:
-    """7 = Full house, 1 = one of each"""
-    acc = get_significant_score(hand)
-    for i in range(5):
-        acc += pow(14, i) * score_map[hand[-(i + 1)]]
-    return acc
+def encode_hand(hand: str, jokers: bool = False) -> int:
+    """Type rank above five 4-bit card ranks, so hands order as plain ints"""
+    ranks = score_map_2 if jokers else score_map
+    counts: dict[str, int] = {}
+    acc = 0
+    for card in hand:
+        acc = acc << 4 | ranks[card]
+        counts[card] = counts.get(card, 0) + 1
+    if jokers and "J" in counts and len(counts) > 1:
+        joker_count = counts.pop("J")
+        counts[max(counts, key=counts.__getitem__)] += joker_count
+    return hand_types[tuple(sorted(counts.values()))] << 20 | acc
+
+
+def total_winnings(inp: str, jokers: bool = False) -> int:
+    hands = [line.split() for line in inp.splitlines()]
+    keys = np.fromiter((encode_hand(hand, jokers) for hand, _ in hands), np.int64)
+    bets = np.fromiter((int(bet) for _, bet in hands), np.int64)
+    ranks = np.arange(1, len(hands) + 1, dtype=np.int64)
+    return int((bets[np.argsort(keys, kind="stable")] * ranks).sum())
+
+
+def write_sorted_run(lines: list[str], jokers: bool, path: str) -> None:
+    records = np.array(
+        [(encode_hand(hand, jokers), int(bet)) for hand, bet in map(str.split, lines)],
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    records[np.argsort(records[:, 0], kind="stable")].tofile(path)
+
+
+def read_run(path: str, block_records: int = 1 << 16) -> Iterator[list[int]]:
+    with open(path, "rb") as f:
+        while block := f.read(block_records * 16):
+            yield from np.frombuffer(block, dtype=np.int64).reshape(-1, 2).tolist()
+
+
+def external_total_winnings(
+    path: str, jokers: bool = False, run_size: int = 1_000_000
+) -> int:
+    """Total winnings of a hand file too big for memory: sorted runs of run_size
+    (key, bet) records are spilled to temporary files, then k-way merged"""
+    with tempfile.TemporaryDirectory() as tmp_dir, open(path) as f:
+        run_paths = []
+        while batch := list(islice(f, run_size)):
+            run_path = os.path.join(tmp_dir, f"run{len(run_paths)}.bin")
+            write_sorted_run([line for line in batch if line.strip()], jokers, run_path)
+            run_paths.append(run_path)
+        merged = heapq.merge(*map(read_run, run_paths), key=itemgetter(0))
+        acc = 0
+        for rank, (_, bet) in enumerate(merged, start=1):
+            acc += rank * bet
+        return acc
+
+
+class FenwickTree:
+    def __init__(self: FenwickTree, size: int):
+        self.tree = array("q", bytes(8 * (size + 1)))
+
+    def add(self: FenwickTree, idx: int, delta: int) -> None:
+        idx += 1
+        while idx < len(self.tree):
+            self.tree[idx] += delta
+            idx += idx & -idx
+
+    def prefix_sum(self: FenwickTree, idx: int) -> int:
+        """Sum of entries 0..idx inclusive"""
+        idx += 1
+        acc = 0
+        while idx > 0:
+            acc += self.tree[idx]
+            idx -= idx & -idx
+        return acc
+
+
+class OnlineWinnings:
+    """Total winnings kept current as hands arrive, with hand counts and bets held in
+    Fenwick trees over every possible hand (7 types x 13^5 card orders)"""
+
+    key_space = 7 * 13**5
+
+    def __init__(self: OnlineWinnings, jokers: bool = False):
+        self.jokers = jokers
+        self.lowest_rank = min((score_map_2 if jokers else score_map).values())
+        self.counts = FenwickTree(self.key_space)
+        self.bets = FenwickTree(self.key_space)
+        self.bet_total = 0
+        self.total = 0
+
+    def compact_key(self: OnlineWinnings, hand: str) -> int:
+        key = encode_hand(hand, self.jokers)
+        acc = key >> 20
+        for shift in range(16, -4, -4):
+            acc = acc * 13 + (key >> shift & 0xF) - self.lowest_rank
+        return acc
+
+    def insert(self: OnlineWinnings, hand: str, bet: int) -> int:
+        """Add a hand, ranked after equal hands already in, and return the new total"""
+        idx = self.compact_key(hand)
+        rank = self.counts.prefix_sum(idx) + 1
+        # Every hand ranked above the new one moves up a place
+        self.total += self.bet_total - self.bets.prefix_sum(idx) + rank * bet
+        self.counts.add(idx, 1)
+        self.bets.add(idx, bet)
+        self.bet_total += bet
+        return self.total
 
 
 def solve_part_1(inp: str) -> int:
-    bets = {}
-    hand_acc = []
-    for line in inp.splitlines():
-        lhs, rhs = line.split()
-        hand_acc.append(lhs)
-        bets[lhs] = int(rhs)
-    hand_acc.sort(key=hand_to_score)
-    to_ret = 0
-    for idx, hand in enumerate(hand_acc, start=1):
-        to_ret += idx * bets[hand]
-    return to_ret
-
-
-def get_significant_score_2(hand: str) -> int:
-    jokers = hand.count("J")
-    hand = hand.replace("J", "")
-    acc = [hand.count(char) for char in labels if hand.count(char) != 0]
-    if len(acc) == 0:
-        acc.append(0)
-    biggest = max(acc)
-    i = acc.index(biggest)
-    acc[i] += jokers
-    acc.sort()
-    match acc:
-        case [5]:
-            return 7_000_000
-        case [1, 4]:
-            return 6_000_000
-        case [2, 3]:
-            return 5_000_000
-        case [1, 1, 3]:
-            return 4_000_000
-        case [1, 2, 2]:
-            return 3_000_000
-        case [1, 1, 1, 2]:
-            return 2_000_000
-    return 1_000_000
-
-
-def hand_to_score_2(hand: str) -> int:
-    """7 = Full house, 1 = one of each"""
-    acc = get_significant_score_2(hand)
-    for i in range(5):
-        acc += pow(14, i) * score_map_2[hand[-(i + 1)]]
-    return acc
+    return total_winnings(inp)
 
 
 def solve_part_2(inp: str) -> int:
-    bets = {}
-    hand_acc = []
-    for line in inp.splitlines():
-        lhs, rhs = line.split()
-        hand_acc.append(lhs)
-        bets[lhs] = int(rhs)
-    hand_acc.sort(key=hand_to_score_2)
-    to_ret = 0
-    for idx, hand in enumerate(hand_acc, start=1):
-        to_ret += idx * bets[hand]
-    return to_ret
+    return total_winnings(inp, jokers=True)
 
 
 if __name__ == "__main__":
+    if sys.argv[1] == "--external":
+        print(f"{external_total_winnings(sys.argv[2]) = }")
+        print(f"{external_total_winnings(sys.argv[2], jokers=True) = }")
+        sys.exit()
     assert solve_part_1(test_inp) == 6440
     assert solve_part_2(test_inp) == 5905
+    assert encode_hand("JJJJJ", jokers=True) == 6 << 20 | 0x11111
+    online = OnlineWinnings(jokers=True)
+    for line in test_inp.splitlines():
+        hand, bet = line.split()
+        online_total = online.insert(hand, int(bet))
+    assert online_total == 5905
     inp = sys.argv[1]
     print(f"{solve_part_1(inp) = }")
     print(f"{solve_part_2(inp) = }")
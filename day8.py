@@ -1,10 +1,17 @@
 #!/usr/bin/env python3
 
+from __future__ import annotations
+
 import sys
 from dataclasses import dataclass
+from typing import Callable
 import re
-from itertools import cycle
+import random
+import time
+from itertools import cycle, islice
+from multiprocessing import Pool
 import math
+import numpy as np
 
 test_inp = """RL
 
@@ -46,40 +53,252 @@ def parse_input(inp: str) -> tuple[str, dict[str, Fork]]:
     return (rl_str, fork_map)
 
 
+@dataclass(frozen=True)
+class Network:
+    """Nodes as integer ids with successor arrays, plus where every node ends up
+    after one full pass of the L/R string and whether it passed a target on the way"""
+
+    ids: dict[str, int]
+    left: np.ndarray
+    right: np.ndarray
+    targets: np.ndarray
+    rl_str: str
+    jump: list[int]
+    hits_target: list[bool]
+
+    @classmethod
+    def compile(
+        cls, rl_str: str, fork_map: dict[str, Fork], is_target: Callable[[str], bool]
+    ) -> Network:
+        ids = {name: idx for idx, name in enumerate(fork_map)}
+        left = np.array([ids[fork.left] for fork in fork_map.values()], dtype=np.int64)
+        right = np.array(
+            [ids[fork.right] for fork in fork_map.values()], dtype=np.int64
+        )
+        targets = np.array([is_target(name) for name in fork_map], dtype=bool)
+        positions = np.arange(len(ids), dtype=np.int64)
+        hits = np.zeros(len(ids), dtype=bool)
+        for l_or_r in rl_str:
+            positions = left[positions] if l_or_r == "L" else right[positions]
+            hits |= targets[positions]
+        return cls(
+            ids, left, right, targets, rl_str, positions.tolist(), hits.tolist()
+        )
+
+    def steps_to_target(self: Network, start: str) -> int:
+        """Whole passes of the L/R string by jump table, then single steps in the
+        pass that reaches a target"""
+        node = self.ids[start]
+        steps_taken = 0
+        for _ in range(len(self.ids)):
+            if self.hits_target[node]:
+                break
+            node = self.jump[node]
+            steps_taken += len(self.rl_str)
+        else:
+            raise ValueError(f"{start} never reaches a target")
+        for l_or_r in self.rl_str:
+            steps_taken += 1
+            node = int(self.left[node] if l_or_r == "L" else self.right[node])
+            if self.targets[node]:
+                return steps_taken
+
+
 def solve_part_1(inp: str) -> int:
     rl_str, fork_map = parse_input(inp)
-    steps_taken = 0
-    current = "AAA"
-    for l_or_r in cycle(rl_str):
-        steps_taken += 1
-        if l_or_r == "L":
-            current = fork_map[current].left
-        else:
-            current = fork_map[current].right
-        if current == "ZZZ":
-            return steps_taken
+    network = Network.compile(rl_str, fork_map, lambda node: node == "ZZZ")
+    return network.steps_to_target("AAA")
+
+
+@dataclass(frozen=True)
+class GhostCycle:
+    """Steps at which one ghost stands on a target: any in tail_hits, then from
+    cycle_start on, the cycle_hits repeating every cycle_length steps"""
+
+    tail_hits: list[int]
+    cycle_start: int
+    cycle_length: int
+    cycle_hits: list[int]
+
+    def is_target_step(self: GhostCycle, step: int) -> bool:
+        if step <= self.cycle_start:
+            return step in self.tail_hits
+        offset = (step - self.cycle_start - 1) % self.cycle_length
+        return self.cycle_start + 1 + offset in self.cycle_hits
+
+
+def analyse_ghost(network: Network, start: str) -> GhostCycle:
+    """Find the ghost's cycle in (node, instruction index) states. The states at
+    index 0 repeat first, so the cycle is found a whole pass at a time"""
+    node = network.ids[start]
+    pass_of: dict[int, int] = {}
+    pass_nodes = []
+    while node not in pass_of:
+        pass_of[node] = len(pass_nodes)
+        pass_nodes.append(node)
+        node = network.jump[node]
+    rl_length = len(network.rl_str)
+    cycle_start = pass_of[node] * rl_length
+    hits = []
+    for pass_idx, node in enumerate(pass_nodes):
+        if not network.hits_target[node]:
+            continue
+        for step, l_or_r in enumerate(network.rl_str, start=pass_idx * rl_length + 1):
+            node = int(network.left[node] if l_or_r == "L" else network.right[node])
+            if network.targets[node]:
+                hits.append(step)
+    return GhostCycle(
+        [step for step in hits if step <= cycle_start],
+        cycle_start,
+        (len(pass_nodes) * rl_length) - cycle_start,
+        [step for step in hits if step > cycle_start],
+    )
+
+
+def crt(congruences: list[tuple[list[int], int]]) -> tuple[list[int], int]:
+    """Residues r mod M satisfying, for every (options, m), r = some option mod m.
+    Moduli need not be coprime"""
+    residues, modulus = [0], 1
+    for options, mod in congruences:
+        g = math.gcd(modulus, mod)
+        step_inverse = pow(modulus // g, -1, mod // g)
+        combined = modulus // g * mod
+        acc = set()
+        for residue in residues:
+            for option in options:
+                if (option - residue) % g:
+                    continue
+                k = (option - residue) // g * step_inverse % (mod // g)
+                acc.add((residue + modulus * k) % combined)
+        residues, modulus = sorted(acc), combined
+    return residues, modulus
+
 
+worker_network: Network | None = None
 
-def solve_part_2(inp: str) -> int:
+
+def init_worker(network: Network) -> None:
+    global worker_network
+    worker_network = network
+
+
+def analyse_ghost_in_worker(start: str) -> GhostCycle:
+    return analyse_ghost(worker_network, start)
+
+
+def earliest_common_step(cycles: list[GhostCycle]) -> int:
+    candidates = [
+        step
+        for cycle in cycles
+        for step in cycle.tail_hits
+        if all(other.is_target_step(step) for other in cycles)
+    ]
+    residues, modulus = crt(
+        [(cycle.cycle_hits, cycle.cycle_length) for cycle in cycles]
+    )
+    first_periodic = max(cycle.cycle_start for cycle in cycles) + 1
+    for residue in residues:
+        laps = -((residue - first_periodic) // modulus)
+        candidates.append(residue + laps * modulus)
+    if not candidates:
+        raise ValueError("ghosts never stand on targets together")
+    return min(candidates)
+
+
+def solve_part_2(inp: str, workers: int | None = None) -> int:
     rl_str, fork_map = parse_input(inp)
-    current_nodes = [node for node in fork_map if node.endswith("A")]
-    acc = []
-    for node in current_nodes:
-        steps_taken = 0
-        for l_or_r in cycle(rl_str):
-            steps_taken += 1
-            if l_or_r == "L":
-                node = fork_map[node].left
-            else:
-                node = fork_map[node].right
-            if node.endswith("Z"):
-                acc.append(steps_taken)
-                break
-    return math.lcm(*acc)
+    network = Network.compile(rl_str, fork_map, lambda node: node.endswith("Z"))
+    starts = [node for node in fork_map if node.endswith("A")]
+    with Pool(workers, initializer=init_worker, initargs=(network,)) as pool:
+        cycles = pool.map(analyse_ghost_in_worker, starts)
+    return earliest_common_step(cycles)
+
+
+def pass_hit_words(network: Network) -> np.ndarray:
+    """Bit k of row n is set when a walker starting a pass at node n stands on a
+    target after step k + 1 of the pass, packed into uint64 words"""
+    rl_length = len(network.rl_str)
+    words = np.zeros((len(network.ids), (rl_length + 63) // 64), dtype=np.uint64)
+    positions = np.arange(len(network.ids), dtype=np.int64)
+    for k, l_or_r in enumerate(network.rl_str):
+        successors = network.left if l_or_r == "L" else network.right
+        positions = successors[positions]
+        hit = network.targets[positions].astype(np.uint64)
+        words[:, k // 64] |= hit << np.uint64(k % 64)
+    return words
+
+
+def solve_part_2_brute_force(
+    inp: str, max_steps: int | None = None, report_every: int = 10**8
+) -> int | None:
+    """Walk every ghost together, a whole pass per array lookup, until they all
+    stand on a target after the same step. Gives up after max_steps"""
+    rl_str, fork_map = parse_input(inp)
+    network = Network.compile(rl_str, fork_map, lambda node: node.endswith("Z"))
+    words = pass_hit_words(network)
+    jump = np.array(network.jump, dtype=np.int64)
+    positions = np.array(
+        [network.ids[node] for node in fork_map if node.endswith("A")], dtype=np.int64
+    )
+    steps_taken = 0
+    next_report = report_every
+    start = time.perf_counter()
+    while max_steps is None or steps_taken < max_steps:
+        together = np.bitwise_and.reduce(words[positions], axis=0)
+        for word_idx, word in enumerate(together.tolist()):
+            if word:
+                bit = (word & -word).bit_length() - 1
+                return steps_taken + word_idx * 64 + bit + 1
+        positions = jump[positions]
+        steps_taken += len(rl_str)
+        if steps_taken >= next_report:
+            rate = steps_taken / (time.perf_counter() - start)
+            print(f"{steps_taken:,} steps, {rate:,.0f} steps/s", flush=True)
+            next_report += report_every
+    return None
+
+
+def random_network(size: int, rl_length: int = 300) -> tuple[str, dict[str, Fork]]:
+    names = [f"{idx:06d}{'Z' if idx % 1000 == 0 else 'X'}" for idx in range(size)]
+    fork_map = {
+        name: Fork(random.choice(names), random.choice(names)) for name in names
+    }
+    return "".join(random.choices("LR", k=rl_length)), fork_map
+
+
+def benchmark(sizes: tuple[int, ...] = (10**4, 10**5, 5 * 10**5)) -> None:
+    for size in sizes:
+        rl_str, fork_map = random_network(size)
+        start = time.perf_counter()
+        network = Network.compile(rl_str, fork_map, lambda node: node.endswith("Z"))
+        compile_time = time.perf_counter() - start
+
+        passes = 10_000
+        node = next(iter(fork_map))
+        start = time.perf_counter()
+        for l_or_r in islice(cycle(rl_str), passes * len(rl_str)):
+            node = fork_map[node].left if l_or_r == "L" else fork_map[node].right
+        naive_rate = passes * len(rl_str) / (time.perf_counter() - start)
+
+        node_id = 0
+        start = time.perf_counter()
+        for _ in range(passes):
+            node_id = network.jump[node_id]
+        jump_rate = passes * len(rl_str) / (time.perf_counter() - start)
+        assert network.ids[node] == node_id
+        print(
+            f"{size:,} nodes: compile {compile_time:.2f}s, "
+            f"stepping {naive_rate:,.0f} steps/s, jump table {jump_rate:,.0f} steps/s"
+        )
+
 
 if __name__ == "__main__":
+    if sys.argv[1] == "--bench":
+        benchmark()
+        sys.exit()
     assert solve_part_1(test_inp) == 2
     assert solve_part_2(test_inp_2) == 6
+    assert solve_part_2_brute_force(test_inp_2) == 6
     inp = sys.argv[1]
     print(f"{solve_part_1(inp) = }")
     print(f"{solve_part_2(inp) = }")
@@ -2,7 +2,9 @@
 
 import sys
 import re
-from itertools import pairwise
+import math
+import numpy as np
+from dataclasses import dataclass, field
 
 test_inp = """0 3 6 9 12 15
 1 3 6 10 15 21
@@ -11,38 +13,118 @@ test_inp = """0 3 6 9 12 15
 ints_regex = re.compile(r"[\d-]+")
 
 
+def extrapolation_weights(length: int) -> tuple[list[int], list[int]]:
+    """Weights giving the next and previous values of a history as a dot product,
+    the closed form of the difference pyramid"""
+    forward = [
+        (-1) ** (length - 1 - idx) * math.comb(length, idx) for idx in range(length)
+    ]
+    backward = [(-1) ** idx * math.comb(length, idx + 1) for idx in range(length)]
+    return forward, backward
+
+
+def extrapolate_batch(histories: list[list[int]]) -> tuple[int, int]:
+    """Sums of next and previous values, one matrix-vector product per history length"""
+    by_length: dict[int, list[list[int]]] = {}
+    for history in filter(None, histories):
+        by_length.setdefault(len(history), []).append(history)
+    next_acc = 0
+    prev_acc = 0
+    for length, group in by_length.items():
+        forward, backward = extrapolation_weights(length)
+        largest = max(abs(x) for history in group for x in history)
+        # The weights sum to 2 ** length in magnitude, which bounds them and the result
+        if length < 62 and largest << length < 1 << 62:
+            values = np.array(group, dtype=np.int64)
+            next_acc += sum((values @ np.array(forward, dtype=np.int64)).tolist())
+            prev_acc += sum((values @ np.array(backward, dtype=np.int64)).tolist())
+        else:
+            for history in group:
+                next_acc += sum(w * x for w, x in zip(forward, history))
+                prev_acc += sum(w * x for w, x in zip(backward, history))
+    return next_acc, prev_acc
+
+
+def solve(inp: str) -> tuple[int, int]:
+    return extrapolate_batch(
+        [[int(x) for x in ints_regex.findall(line)] for line in inp.splitlines()]
+    )
+
+
 def solve_part_1(inp: str) -> int:
-    acc_score = 0
-    for line in inp.splitlines():
-        ints: list[int] = [int(x) for x in ints_regex.findall(line)]
-        seqs: list[list[int]] = [ints]
-        while not all(x == 0 for x in seqs[-1]):
-            seqs.append([pair[1] - pair[0] for pair in pairwise(seqs[-1])])
-        seqs[-1].append(0)
-        for idx in range(len(seqs) - 2, -1, -1):
-            seqs[idx].append(seqs[idx][-1] + seqs[idx + 1][-1])
-        acc_score += seqs[0][-1]
-    return acc_score
+    return solve(inp)[0]
 
 
 def solve_part_2(inp: str) -> int:
-    acc_score = 0
-    for line in inp.splitlines():
-        ints: list[int] = [int(x) for x in ints_regex.findall(line)]
-        ints.reverse()
-        seqs: list[list[int]] = [ints]
-        while not all(x == 0 for x in seqs[-1]):
-            seqs.append([pair[1] - pair[0] for pair in pairwise(seqs[-1])])
-        seqs[-1].append(0)
-        for idx in range(len(seqs) - 2, -1, -1):
-            seqs[idx].append(seqs[idx][-1] + seqs[idx + 1][-1])
-        acc_score += seqs[0][-1]
-    return acc_score
+    return solve(inp)[1]
+
+
+@dataclass
+class SensorState:
+    """Trailing edge of one sensor's difference table, edges[k] being the latest
+    k-th difference. With max_depth set, only the last max_depth readings are
+    extrapolated"""
+
+    max_depth: int | None = None
+    edges: list[int] = field(default_factory=list)
+
+    def append(self, reading: int) -> int:
+        """Take a reading and return the predicted next one"""
+        carry = reading
+        for level, old in enumerate(self.edges):
+            self.edges[level] = carry
+            carry -= old
+        if self.max_depth is None or len(self.edges) < self.max_depth:
+            self.edges.append(carry)
+        return sum(self.edges)
+
+
+class SensorBank:
+    """Many sensors' trailing edges as rows of one int64 array, each sensor
+    extrapolating its last `depth` readings"""
+
+    def __init__(self, sensor_count: int, depth: int):
+        self.edges = np.zeros((sensor_count, depth), dtype=np.int64)
+        self.seen = np.zeros(sensor_count, dtype=np.int64)
+
+    def append(self, sensor: int, reading: int) -> int:
+        row = self.edges[sensor]
+        carry = reading
+        for level in range(min(int(self.seen[sensor]) + 1, row.shape[0])):
+            old = int(row[level])
+            row[level] = carry
+            carry -= old
+        self.seen[sensor] += 1
+        return int(row.sum())
+
+    def append_all(self, readings: np.ndarray) -> np.ndarray:
+        """Take one reading per sensor and return every sensor's prediction"""
+        carry = np.array(readings, dtype=np.int64)
+        for level in range(self.edges.shape[1]):
+            old = self.edges[:, level].copy()
+            self.edges[:, level] = np.where(self.seen >= level, carry, old)
+            carry -= old
+        self.seen += 1
+        return self.edges.sum(axis=1)
 
 
 if __name__ == "__main__":
     assert solve_part_1(test_inp) == 114
     assert solve_part_2(test_inp) == 2
+    assert extrapolate_batch([[10**18, 2 * 10**18]]) == (3 * 10**18, 0)
+    assert solve(" ".join(["0"] * 70)) == (0, 0)
+    sensor = SensorState()
+    assert [sensor.append(x) for x in (10, 13, 16, 21, 30)][-1] == 45
+    readings = [[10, 13, 16, 21, 30], [0, 3, 6, 9, 12], [1, 3, 6, 10, 15]]
+    states = [SensorState(max_depth=3) for _ in readings]
+    bank = SensorBank(len(readings), depth=3)
+    batch_bank = SensorBank(len(readings), depth=3)
+    for step in range(5):
+        batch = batch_bank.append_all([history[step] for history in readings])
+        for sensor_id, history in enumerate(readings):
+            expected = states[sensor_id].append(history[step])
+            assert bank.append(sensor_id, history[step]) == expected
+            assert batch[sensor_id] == expected
     inp = sys.argv[1]
     print(f"{solve_part_1(inp) = }")
     print(f"{solve_part_2(inp) = }")